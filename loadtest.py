@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+
+"""Markdown Grid Extension load test
+
+Replays a generated corpus of documents through the extension at a target
+concurrency and reports throughput, latency percentiles and peak RSS for
+each worker. Everything runs locally, so different configurations could be
+compared before deployment.
+
+Usage:
+
+    python loadtest.py
+    python loadtest.py --mix plain=2,grid=6,malformed=2 --concurrency 8
+    python loadtest.py --mode process --profiles skeleton,960gs
+    python loadtest.py --config max_markers=200 --config on_limit=text
+
+The extension is loaded as an explicit mdx_grid.GridExtension instance, which
+works with both Python-Markdown 2.x and 3.x.
+
+Document kinds:
+ - plain -- markdown text without grid markup
+ - grid -- grid-heavy documents with nested and multicolumn rows
+ - malformed -- incorrect marker sequences (unclosed rows, orphan
+   separators and terminators, odd row arguments)
+
+"""
+
+import os
+import sys
+import math
+import random
+import argparse
+import timeit
+import multiprocessing
+import multiprocessing.pool
+import markdown
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import mdx_grid
+
+
+DOC_KINDS = ('plain', 'grid', 'malformed')
+DEFAULT_MIX = 'plain=4,grid=4,malformed=2'
+DEFAULT_PROFILES = (mdx_grid.BOOTSTRAP_PROFILE, mdx_grid.BOOTSTRAP3_PROFILE,
+                    mdx_grid.SKELETON_PROFILE, mdx_grid.GS960_PROFILE)
+PERCENTILES = (50, 95, 99)
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipisicing elit sed do '
+         'eiusmod tempor incididunt ut labore et dolore magna aliqua').split()
+
+
+def gen_paragraph(rnd):
+    words = [rnd.choice(WORDS) for _ in range(rnd.randint(20, 80))]
+    if rnd.random() < 0.3:
+        words[rnd.randrange(len(words))] = '**%s**' % rnd.choice(WORDS)
+    if rnd.random() < 0.2:
+        words[rnd.randrange(len(words))] = '[link](http://example.com)'
+    return ' '.join(words).capitalize() + '.'
+
+
+def gen_block(rnd):
+    """Generates a random markdown block: a paragraph, a list or
+    a header."""
+    kind = rnd.random()
+    if kind < 0.15:
+        return '## ' + ' '.join(rnd.sample(WORDS, 3)).capitalize()
+    elif kind < 0.3:
+        return '\n'.join(['- ' + ' '.join(rnd.sample(WORDS, 5))
+                          for _ in range(rnd.randint(2, 6))])
+    return gen_paragraph(rnd)
+
+
+def gen_row_args(rnd, cols):
+    args = []
+    for _ in range(cols):
+        value = str(rnd.randint(1, 12))
+        if rnd.random() < 0.2:
+            value += ':%d' % rnd.randint(1, 4)
+        args.append(value)
+    return ', '.join(args)
+
+
+def gen_row(rnd, depth=0):
+    cols = rnd.randint(1, 6)
+    lines = ['-- row %s --' % gen_row_args(rnd, rnd.randint(0, cols))]
+    for num in range(cols):
+        if num:
+            lines.append('--')
+        for _ in range(rnd.randint(1, 3)):
+            lines += [gen_block(rnd), '']
+        if depth < 2 and rnd.random() < 0.1:
+            lines += gen_row(rnd, depth + 1)
+    lines.append('-- end --')
+    return lines
+
+
+def gen_plain(rnd):
+    blocks = [gen_block(rnd) for _ in range(rnd.randint(5, 40))]
+    return '\n\n'.join(blocks)
+
+
+def gen_grid(rnd):
+    lines = []
+    for _ in range(rnd.randint(3, 20)):
+        lines += gen_row(rnd) + ['', gen_block(rnd), '']
+    return '\n'.join(lines)
+
+
+def gen_malformed(rnd):
+    lines = []
+    for _ in range(rnd.randint(3, 20)):
+        row = gen_row(rnd)
+        damage = rnd.random()
+        if damage < 0.25:
+            row = row[:-1]  # Unclosed row
+        elif damage < 0.5:
+            row = row[1:]  # Orphan separators and terminator
+        elif damage < 0.75:
+            row[0] = '-- row %s --' % (',' * rnd.randint(1, 50))
+        else:
+            row.insert(rnd.randrange(len(row)), '-- end --')
+        lines += row + ['', gen_block(rnd), '']
+    return '\n'.join(lines)
+
+
+GENERATORS = {
+    'plain': gen_plain,
+    'grid': gen_grid,
+    'malformed': gen_malformed,
+}
+
+
+def parse_mix(value):
+    """Parses document kinds mix definition like 'plain=4,grid=4' to
+    a dictionary mapping document kinds to weights."""
+    mix = {}
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in DOC_KINDS:
+            raise argparse.ArgumentTypeError("Unknown document kind: '%s'" %
+                                             kind)
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def parse_config_value(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_config(items):
+    """Parses a list of 'key=value' strings to extension configuration
+    dictionary."""
+    conf = {}
+    for item in items or []:
+        key, _, value = item.partition('=')
+        conf[key.strip()] = parse_config_value(value.strip())
+    return conf
+
+
+def gen_corpus(mix, profiles, size, seed):
+    """Generates a list of (kind, profile, text) tuples."""
+    rnd = random.Random(seed)
+    kinds = sorted(mix)
+    weights = [mix[kind] for kind in kinds]
+    total = sum(weights)
+    corpus = []
+    for _ in range(size):
+        point = rnd.random() * total
+        for kind, weight in zip(kinds, weights):
+            point -= weight
+            if point < 0:
+                break
+        corpus.append((kind, rnd.choice(profiles), GENERATORS[kind](rnd)))
+    return corpus
+
+
+def get_peak_rss():
+    """Returns peak resident set size for the current process in kilobytes,
+    or None if it could not be measured."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is measured in bytes on OS X and kilobytes on Linux
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def get_converter(profile, conf):
+    """Creates a Markdown instance with the grid extension configured
+    for the profile."""
+    extension = mdx_grid.GridExtension(dict(conf, profile_name=profile))
+    return markdown.Markdown(extensions=[extension])
+
+
+def check_converters(profiles, conf):
+    """Makes sure the extension could be loaded and used for each profile
+    before starting the workers. Returns an error message or None."""
+    for profile in profiles:
+        try:
+            get_converter(profile, conf).convert('-- row --\ntest\n-- end --')
+        except Exception as e:
+            return ("Grid extension could not be used with Markdown %s "
+                    "(profile '%s'): %s" % (markdown.__version__, profile, e))
+    return None
+
+
+def run_worker(args):
+    """Converts a chunk of documents. Markdown instances are reused for
+    each profile within the chunk.
+
+    Returns:
+        A tuple of successful conversion latencies list, failed conversion
+        latencies list, peak RSS and worker process id."""
+    tasks, conf = args
+    timer = timeit.default_timer
+    converters = {}
+    latencies = []
+    errors = []
+
+    for kind, profile, text in tasks:
+        md = converters.get(profile)
+        if md is None:
+            md = converters[profile] = get_converter(profile, conf)
+
+        started = timer()
+        try:
+            md.convert(text)
+        except Exception:
+            errors.append(timer() - started)
+        else:
+            latencies.append(timer() - started)
+        md.reset()
+
+    return latencies, errors, get_peak_rss(), os.getpid()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile for a sorted list of values."""
+    if not values:
+        return 0.0
+    rank = int(math.ceil(pct / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+def run(corpus, requests, concurrency, mode, conf):
+    """Replays the corpus until the requested number of conversions is
+    reached and returns a tuple of worker results and wall time."""
+    tasks = [corpus[num % len(corpus)] for num in range(requests)]
+    chunks = [(tasks[num::concurrency], conf) for num in range(concurrency)]
+
+    if mode == 'process':
+        pool = multiprocessing.Pool(concurrency)
+    else:
+        pool = multiprocessing.pool.ThreadPool(concurrency)
+
+    started = timeit.default_timer()
+    try:
+        results = pool.map(run_worker, chunks)
+    finally:
+        pool.close()
+        pool.join()
+    return results, timeit.default_timer() - started
+
+
+def report(results, elapsed):
+    """Prints the load test results. Latency percentiles are calculated
+    for successful conversions only; failed ones are reported separately
+    since they usually end early."""
+    latencies = sorted(sum([result[0] for result in results], []))
+    errors = sorted(sum([result[1] for result in results], []))
+    total = len(latencies) + len(errors)
+
+    print("Requests: %d (%d errors)" % (total, len(errors)))
+    print("Wall time: %.3f s" % elapsed)
+    print("Throughput: %.1f req/s" % (total / elapsed if elapsed else 0))
+    for pct in PERCENTILES:
+        print("p%d latency: %.3f ms" % (pct, percentile(latencies, pct) * 1000))
+    if errors:
+        print("p50 error latency: %.3f ms" % (percentile(errors, 50) * 1000))
+
+    # Several chunks could be processed by the same worker process, and
+    # threads share a single one, so RSS is reported per process.
+    peak_rss = {}
+    for result in results:
+        rss, pid = result[2] or 0, result[3]
+        peak_rss[pid] = max(peak_rss.get(pid, 0), rss)
+    for pid in sorted(peak_rss):
+        print("Peak RSS, pid %d: %s KB" % (pid, peak_rss[pid] or 'n/a'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="document kinds with weights (default: %s)" %
+                        DEFAULT_MIX)
+    parser.add_argument('--profiles', default=','.join(DEFAULT_PROFILES),
+                        help="comma-separated configuration profile names")
+    parser.add_argument('--config', action='append', metavar='KEY=VALUE',
+                        help="extra extension configuration parameter")
+    parser.add_argument('--corpus-size', type=int, default=200,
+                        help="number of generated documents")
+    parser.add_argument('--requests', type=int, default=2000,
+                        help="total number of conversions")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="number of workers")
+    parser.add_argument('--mode', choices=('thread', 'process'),
+                        default='thread', help="worker type")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed for corpus generation")
+    args = parser.parse_args()
+
+    profiles = [name.strip() for name in args.profiles.split(',')]
+    for name in profiles:
+        if name not in mdx_grid.PROFILES:
+            parser.error("unknown profile: '%s' (available: %s)" %
+                         (name, ', '.join(sorted(mdx_grid.PROFILES))))
+
+    conf = parse_config(args.config)
+    error = check_converters(profiles, conf)
+    if error:
+        parser.error(error)
+
+    corpus = gen_corpus(args.mix, profiles, args.corpus_size, args.seed)
+    results, elapsed = run(corpus, args.requests, args.concurrency,
+                           args.mode, conf)
+    report(results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,713 @@
+"""
+Grid Extension core
+===================
+
+Markdown-independent part of the grid extension: configuration profiles,
+grid marker processing and HTML rendering. This module never imports
+Python-Markdown, so it could be used to build grids from pre-rendered HTML
+fragments at string-join speed:
+
+    import mdx_grid_core
+    html = mdx_grid_core.render_grid('5, 2, 5', [col1, col2, col3])
+    html = mdx_grid_core.render_grid_text(source, 'skeleton')
+
+All public names are re-exported by `mdx_grid`. See its docstring for
+the configuration parameters description.
+
+"""
+
+import re
+import timeit
+
+
+# Extension configuration profile names
+BOOTSTRAP_PROFILE = 'bootstrap'
+BOOTSTRAP3_PROFILE = 'bootstrap3'
+SKELETON_PROFILE = 'skeleton'
+GS960_PROFILE = '960gs'
+
+# Default configuration profile name. Will be used by the extension
+# if custom configuration is not specified.
+DEFAULT_PROFILE = BOOTSTRAP_PROFILE
+
+# A complete sete of configuration parameters with no values.
+# Used to complement user-defined profiles.
+BLANK_PROFILE = 'blank'
+
+# Predefined configuration profiles
+PROFILES = {
+    BLANK_PROFILE: {
+        'profile': '',
+        'row_open': '',
+        'row_close': '',
+        'col_open': '',
+        'col_close': '',
+        'default_col': '',
+        'first_col': 'first',
+        'last_col': 'last',
+        'aliases': [],
+        'max_markers': 0,
+        'max_rows': 0,
+        'max_cols': 0,
+        'max_arg_length': 0,
+        'max_class_length': 0,
+        'time_budget': 0,
+        'on_limit': 'raise',
+    },
+    BOOTSTRAP_PROFILE: {
+        'profile': BOOTSTRAP_PROFILE,
+        'row_open': '<div class="row">',
+        'row_close': '</div>',
+        'col_open': '<div class="{value}">',
+        'col_close': '</div>',
+        'default_col': 'span1',
+        'aliases': [
+            (r"\b(\d+)\:(\d+)\b", r"span\1 offset\2"),
+            (r"\b(\d+)\b", r"span\1"),
+        ],
+    },
+    BOOTSTRAP3_PROFILE: {
+        'profile': BOOTSTRAP3_PROFILE,
+        'row_open': '<div class="row">',
+        'row_close': '</div>',
+        'col_open': '<div class="{value}">',
+        'col_close': '</div>',
+        'default_col': 'col-sm-1',
+        'aliases': [
+            (r"\b(\d+)\:(\d+)\b", r"col-sm-\1 col-sm-offset-\2"),
+            (r"\b(\d+)\b", r"col-sm-\1"),
+        ],
+    },
+    SKELETON_PROFILE: {
+        'profile': SKELETON_PROFILE,
+        'row_open': '<div class="row">',
+        'row_close': '</div>',
+        'col_open': '<div class="{value} columns">',
+        'col_close': '</div>',
+        'default_col': 'one',
+        'first_col': 'alpha',
+        'last_col': 'omega',
+        'aliases': [
+            # TODO: Consider to use replacement functions here
+            (r"\:1\b", r"offset-by-one"),
+            (r"\:2\b", r"offset-by-two"),
+            (r"\:3\b", r"offset-by-three"),
+            (r"\:4\b", r"offset-by-four"),
+            (r"\:5\b", r"offset-by-five"),
+            (r"\:6\b", r"offset-by-six"),
+            (r"\:7\b", r"offset-by-seven"),
+            (r"\:8\b", r"offset-by-eight"),
+            (r"\:9\b", r"offset-by-nine"),
+            (r"\:10\b", r"offset-by-ten"),
+            (r"\:11\b", r"offset-by-eleven"),
+            (r"\:12\b", r"offset-by-twelve"),
+            (r"\:13\b", r"offset-by-thirteen"),
+            (r"\:14\b", r"offset-by-fourteen"),
+            (r"\:15\b", r"offset-by-fifteen"),
+            (r"\b1\/3\b", r"one-third"),
+            (r"\b2\/3\b", r"two-thirds"),
+            (r"\b1\b", r"one"),
+            (r"\b2\b", r"two"),
+            (r"\b3\b", r"three"),
+            (r"\b4\b", r"four"),
+            (r"\b5\b", r"five"),
+            (r"\b6\b", r"six"),
+            (r"\b7\b", r"seven"),
+            (r"\b8\b", r"eight"),
+            (r"\b9\b", r"nine"),
+            (r"\b10\b", r"ten"),
+            (r"\b11\b", r"eleven"),
+            (r"\b12\b", r"twelve"),
+            (r"\b13\b", r"thirteen"),
+            (r"\b14\b", r"fourteen"),
+            (r"\b15\b", r"fifteen"),
+            (r"\b16\b", r"sixteen"),
+        ],
+    },
+    GS960_PROFILE: {
+        'profile': GS960_PROFILE,
+        'row_close': '<div class="clear"></div>',
+        'col_open': '<div class="{value}">',
+        'col_close': '</div>',
+        'default_col': 'grid_1',
+        'aliases': [
+            (r"\b0\:(\d+)\:(\d+)\b", r"grid_\1 postfix_\2"),
+            (r"\b(\d+)\:(\d+)\:0\b", r"prefix_\1 grid_\2"),
+            (r"\b(\d+)\:(\d+)\:(\d+)\b", r"prefix_\1 grid_\2 postfix_\3"),
+            (r"\b(\d+)\:(\d+)\b", r""),
+            (r"\b\>(\d+)\b", r"push_\1"),
+            (r"\b\<(\d+)\b", r"pull_\1"),
+            (r"\b(\d+)\b", r"grid_\1"),
+            (r"\ba\b", r"alpha"),
+            (r"\bz\b", r"omega"),
+            (r"", r""),
+        ],
+    },
+}
+
+# Processed configuration profiles cache used by get_profile()
+PROCESSED_PROFILES = {}
+
+# Maximum number of expanded grid tags memoized per configuration, and
+# maximum length of a memoized tag. Tags could come from the document
+# itself as raw HTML comments, so longer ones are never cached to keep
+# the memory used by the cache bounded.
+TAG_CACHE_SIZE = 1024
+TAG_CACHE_KEY_LENGTH = 256
+
+# Grid commands
+ROW_OPEN_CMD = 'row'
+ROW_CLOSE_CMD = 'endrow'
+COL_OPEN_CMD = 'col'
+COL_CLOSE_CMD = 'endcol'
+
+# Actions to take when a resource limit is exceeded
+LIMIT_RAISE = 'raise'
+LIMIT_TEXT = 'text'
+LIMIT_ACTIONS = (LIMIT_RAISE, LIMIT_TEXT)
+
+# Configuration parameters defining resource limits
+LIMITS = ('max_markers', 'max_rows', 'max_cols', 'max_arg_length',
+          'max_class_length', 'time_budget')
+
+# Monotonic clock used for time budget checks
+timer = timeit.default_timer
+
+RE_FLAGS = re.UNICODE | re.IGNORECASE | re.MULTILINE
+
+# Grid markers. Whitespace around row arguments is captured by the group
+# itself (and stripped by parse_row_args) to keep matching time linear:
+# adjacent whitespace quantifiers backtrack polynomially on hostile input.
+ROW_OPEN = re.compile(r"^\s*--\s*row([\w,-\:\s]*)--\s*$", flags=RE_FLAGS)
+ROW_CLOSE = re.compile(r"^\s*--\s*end\s*--\s*$", flags=RE_FLAGS)
+COL_SEP = re.compile(r"^\s*--\s*$", flags=RE_FLAGS)
+
+# Grid tag - a container for command sequence. The lookbehind makes
+# the leading whitespace match only from the beginning of a whitespace run.
+TAG = re.compile(r"(?:(?<!\s)\s*)?<!--grid\:(.*)-->\s*", flags=RE_FLAGS)
+
+
+def process_configuration(source_conf):
+    """Gets a valid configuration profile.
+
+    Arguments:
+        source_conf -- a dictionary received from the consumer during
+            extension configuration.
+
+    Returns:
+        The get_conf() result for specified profile with precompiled aliases.
+        Custom configurations will be compementeds with undefined parameters."""
+
+    # Complement the source configuration dictionary with undefined
+    # parameters.
+    conf = dict(get_conf(BLANK_PROFILE))
+    if not source_conf:
+        conf.update(get_conf(DEFAULT_PROFILE))
+    else:
+        conf.update(source_conf)
+
+    # If there is 'profile_name' key, read rest of the configuration
+    # with get_conf
+    if "profile_name" in conf:
+        conf.update(get_conf(conf["profile_name"]))
+
+    # Updates 'profile' parameter value to 'custom' if it's not
+    # defined.
+    if not conf['profile']:
+        conf['profile'] = 'custom'
+
+    # 'Aliases' is a list of replacements for --row-- marker arguments.
+    # Each item contains a tuple of two items: a regex and a replacement
+    # string itself. Regexes will be compiled for further usage.
+    if not isinstance(conf['aliases'], list):
+        conf['aliases'] = []
+    elif conf['aliases']:
+        cmpl = lambda a: (re.compile(a[0]), a[1])
+        conf['aliases'] = [cmpl(a) for a in conf['aliases']]
+
+    # Resource limits should be non-negative numbers
+    for limit in LIMITS:
+        conf[limit] = parse_limit(limit, conf.get(limit))
+
+    # Validate fallback actions for resource limits
+    on_limit = conf['on_limit']
+    if isinstance(on_limit, dict):
+        for limit in on_limit:
+            if limit not in LIMITS:
+                raise Exception("Unknown limit: '%s'" % str(limit))
+        actions = on_limit.values()
+    else:
+        actions = [on_limit]
+    for action in actions:
+        if action not in LIMIT_ACTIONS:
+            raise Exception("Unknown limit action: '%s'" % str(action))
+
+    # Grid command handlers with precompiled HTML templates
+    conf['handlers'] = get_handlers(conf)
+    conf['tag_cache'] = {}
+    conf['processed'] = True
+
+    return conf
+
+
+def compile_template(template):
+    """Compiles column opening template to a function taking CSS classes
+    string and returning HTML. Templates with a single {value} field are
+    split to prefix and suffix to avoid str.format() calls."""
+
+    parts = template.split('{value}')
+    if len(parts) == 2 and not re.search(r"[{}]", ''.join(parts)):
+        prefix, suffix = parts
+        return lambda value: prefix + value + suffix
+    return lambda value: template.format(value=value)
+
+
+def get_handlers(conf):
+    """Gets grid command handlers for a configuration.
+
+    Returns:
+        A dictionary mapping command names to functions taking command
+        parameters string and returning HTML."""
+
+    row_open = conf['row_open']
+    row_close = conf['row_close']
+    col_close = conf['col_close']
+    col_open = compile_template(conf['col_open'])
+
+    return {
+        ROW_OPEN_CMD: lambda params: row_open,
+        ROW_CLOSE_CMD: lambda params: row_close,
+        COL_OPEN_CMD: col_open,
+        COL_CLOSE_CMD: lambda params: col_close,
+    }
+
+
+def parse_limit(limit, value):
+    """Converts resource limit value to a non-negative number. Time budget
+    is measured in seconds and could be fractional, other limits are
+    integers. Empty value means no limit."""
+
+    try:
+        if isinstance(value, bool):
+            raise ValueError(value)
+        result = float(value or 0)
+        if limit != 'time_budget':
+            if result != int(result):
+                raise ValueError(value)
+            result = int(result)
+        if not result >= 0:
+            raise ValueError(value)
+    except (TypeError, ValueError, OverflowError):
+        message = "Limit value should be a non-negative %s: %s = '%s'"
+        kind = 'number' if limit == 'time_budget' else 'integer'
+        raise Exception(message % (kind, limit, str(value)))
+    return result
+
+
+def get_limit_action(conf, limit):
+    """Gets the fallback action for the specified resource limit."""
+    on_limit = conf.get('on_limit', LIMIT_RAISE)
+    if isinstance(on_limit, dict):
+        return on_limit.get(limit, LIMIT_RAISE)
+    return on_limit
+
+
+def check_limit(conf, limit, value):
+    """Raises GridLimitError if the value exceeds specified resource limit.
+    Zero or undefined limit means there is no restriction."""
+    max_value = conf.get(limit)
+    if max_value and value > max_value:
+        raise GridLimitError(limit, value, max_value)
+
+
+def get_conf(profile_name=DEFAULT_PROFILE):
+    """Gets unprocessed configuration profile.
+
+    Arguments:
+        profile_name -- predefined configuration profile name. *_PROFILE
+            constants is strictly recomended to be used here.
+
+    Returns:
+        This function returns a configuration parameters dictionary
+        intended to be used for extension configuration with predefined
+        profiles."""
+
+    try:
+        return PROFILES[profile_name]
+    except Exception as e:
+        message = "Specified configuration profile not exists: '%s'."
+        raise Exception(message % profile_name, e)
+
+
+def get_profile(profile):
+    """Gets processed configuration for a profile name or a configuration
+    dictionary. Processed configurations for profile names are cached.
+    Dictionaries returned by process_configuration() are used as is,
+    other ones are processed on each call."""
+
+    if isinstance(profile, dict):
+        if profile.get('processed'):
+            return profile
+        return process_configuration(profile)
+    if profile not in PROCESSED_PROFILES:
+        conf = process_configuration({'profile_name': profile})
+        PROCESSED_PROFILES[profile] = conf
+    return PROCESSED_PROFILES[profile]
+
+
+def expand_aliases(arg, aliases):
+    for subj, repl in aliases:
+        arg = subj.sub(repl, arg)
+    return arg
+
+
+def parse_row_args(arguments, aliases=[]):
+    """Parses --row-- arguments from a string.
+
+    Each row marker contains a set of parameters defining a list of CSS classes
+    for the corresponding column. This function takes a comma-separated string
+    and returns a list of processed values. If there are no arguments, an empty
+    list will be returned.
+
+    Arguments:
+        arguments -- a string of comma-separated arguments. Each argument
+            is a space-separated list of CSS class names or aliases
+            to be be replaced with actual class names.
+        aliases -- replacements list to be applied on the each argument."""
+
+    args = [' '.join(arg.split()) for arg in str(arguments or '').split(',')]
+    args = [] if len(args) == 1 and not args[0] else args
+    return [expand_aliases(arg, aliases) for arg in args]
+
+
+def get_col_classes(styles, count, conf, closed=True):
+    """Gets CSS classes for each column in a row.
+
+    Arguments:
+        styles -- a list of column styles returned by parse_row_args().
+            Columns beyond the list will use 'default_col' value.
+        count -- number of columns in the row.
+        conf -- processed extension configuration.
+        closed -- False for rows with no terminating marker. The last column
+            of such row will not get 'last_col' class.
+
+    Returns:
+        A list of class strings, one per column."""
+
+    classes = []
+    for num in range(count):
+        style = styles[num] if num < len(styles) else conf['default_col']
+        if closed and num == count - 1:
+            xstyle = conf['last_col']
+        elif num == 0:
+            xstyle = conf['first_col']
+        else:
+            xstyle = ''
+        classes.append(style + (xstyle and (' ' + xstyle)))
+    return classes
+
+
+def get_tag(commands):
+    """Generates a preprocessor tag from a set of grid commands."""
+    # Extra line break prevents unclosed paragraphs in markdown HTML output
+    return "\n<!--grid:%s-->" % ';'.join([str(cmd) for cmd in commands])
+
+
+def replace_markers(lines, cmds):
+    """Replace grid markers with tags.
+
+    Arguments:
+        lines -- source markdown text as a list of lines.
+        cmds -- a dictionary mapping line numbers to lists of grid commands.
+
+    Returns:
+        An updated list with grid tags inserted against the markup."""
+
+    for line_num in cmds:
+        lines[line_num] = get_tag(cmds[line_num])
+    return lines
+
+
+def get_closure(row_stack):
+    """Generate the terminating row/column grid tag to complement
+    incompleted markup (if it's incompleted)."""
+    closure = []
+    while row_stack:
+        closure.append(Command(COL_CLOSE_CMD))
+        closure.append(Command(ROW_CLOSE_CMD))
+        row_stack.pop()
+    return closure
+
+
+class GridLimitError(Exception):
+    """Raised when grid markup exceeds one of the configured resource limits.
+
+    Attributes:
+        limit -- configuration parameter name for the exceeded limit.
+        value -- actual value.
+        max_value -- configured limit value."""
+
+    def __init__(self, limit, value, max_value):
+        self.limit = limit
+        self.value = value
+        self.max_value = max_value
+        message = "Grid limit exceeded: %s = %s (max %s)"
+        Exception.__init__(self, message % (limit, value, max_value))
+
+
+class Command:
+    """Grid command representation.
+
+    Attributes:
+        value -- defines the command type.
+        style -- CSS class name(s) for HTML elements generated for the command.
+            See get_col_classes()."""
+
+    def __init__(self, value):
+        self.value = value
+        self.style = ''
+
+    def __str__(self):
+        """Generates text representation for a grid command."""
+        return self.value + self.get_params()
+
+    def get_params(self):
+        """Retruns a formatted parameters string for command
+        instances string representation."""
+        if self.value == COL_OPEN_CMD:
+            return '(%s)' % self.style
+
+        else:
+            return ''
+
+
+def process_markers(lines, conf):
+    """Replaces grid markers with grid tags.
+
+    Arguments:
+        lines -- markdown source as a list of text lines. The list will be
+            updated in place.
+        conf -- processed extension configuration.
+
+    Returns:
+        An updated list with grid tags inserted against the markup and
+        a closure tag appended for unterminated rows."""
+
+    row_stack = []  # Rows stack. Each item contains row marker line number
+    rows = {}       # Rows mapping (first item from the result tuple)
+    cmds = {}       # Commands mapping (second one)
+    r2c = {}        # Row to column mapping (third)
+    closed = set()  # Row marker lines for rows having terminating marker
+    markers = 0     # Processed markers counter
+
+    budget = conf.get('time_budget')
+    started = timer()
+    deadline = started + budget if budget else None
+
+    for line_num in range(len(lines)):
+        line = lines[line_num]
+
+        if deadline and timer() > deadline:
+            raise GridLimitError('time_budget', timer() - started, budget)
+
+        # Processing grid markers
+        matches = ROW_OPEN.match(line)
+        if matches:  # <row [params]><col>
+            markers += 1
+            check_limit(conf, 'max_markers', markers)
+            check_limit(conf, 'max_rows', len(rows) + 1)
+            row_stack.append(line_num)
+            args = matches.group(1) if matches.groups() else ''
+            check_limit(conf, 'max_arg_length', len(args.strip()))
+            rows[line_num] = parse_row_args(args, conf['aliases'])
+            check_limit(conf, 'max_cols', len(rows[line_num]))
+            for arg in rows[line_num]:
+                check_limit(conf, 'max_class_length', len(arg))
+            try:
+                r2c[row_stack[-1]] = [line_num]
+                cmds[line_num] = [Command(ROW_OPEN_CMD),
+                                  Command(COL_OPEN_CMD)]
+            except:
+                # Ignoring incorrect marker sequences
+                # TODO: Consider to add debug logging here
+                pass
+
+        elif ROW_CLOSE.match(line):  # </col></row>
+            markers += 1
+            check_limit(conf, 'max_markers', markers)
+            cmds[line_num] = [Command(COL_CLOSE_CMD),
+                              Command(ROW_CLOSE_CMD)]
+
+            # Mark the row as closed to add 'last_col' to its last column
+            try:
+                closed.add(row_stack.pop())
+            except:
+                # Ignoring incorrect marker sequences
+                # TODO: Consider to add debug logging here
+                pass
+
+        elif COL_SEP.match(line):  # </col><col>
+            # if len(row_stack) and row_stack[-1] in r2c:
+            markers += 1
+            check_limit(conf, 'max_markers', markers)
+            try:
+                r2c[row_stack[-1]].append(line_num)
+                cmds[line_num] = [Command(COL_CLOSE_CMD),
+                                  Command(COL_OPEN_CMD)]
+            except:
+                # Ignoring incorrect marker sequences
+                # TODO: Consider to add debug logging here
+                pass
+            else:
+                check_limit(conf, 'max_cols', len(r2c[row_stack[-1]]))
+
+    # Adding style definition for <col>-s
+    for row_line in rows:
+        col_lines = r2c[row_line]
+        is_closed = row_line in closed
+        classes = get_col_classes(rows[row_line], len(col_lines), conf,
+                                  closed=is_closed)
+        for col_line, style in zip(col_lines, classes):
+            for cmd in cmds[col_line]:
+                # Affect the first COL_OPEN_CMD in line
+                if cmd.value == COL_OPEN_CMD:
+                    cmd.style = style
+                    break
+
+    result = replace_markers(lines, cmds)
+    closure = get_closure(row_stack)
+    return result + [get_tag(closure)] if closure else result
+
+
+def escape_markers(lines):
+    """Escapes grid marker lines with a backslash, so markdown will render
+    them as plain text (e.g. a column separator under a paragraph
+    will not turn it to a header)."""
+    result = []
+    for line in lines:
+        if ROW_OPEN.match(line) or ROW_CLOSE.match(line) or COL_SEP.match(line):
+            indent = len(line) - len(line.lstrip())
+            line = line[:indent] + '\\' + line[indent:]
+        result.append(line)
+    return result
+
+
+def preprocess(lines, conf, escape=False):
+    """Replaces grid markers with grid tags applying the configured limit
+    fallback if the markup exceeds one of the resource limits.
+
+    Arguments:
+        lines -- markdown source as a list of text lines.
+        conf -- processed extension configuration.
+        escape -- escape grid markers for markdown when 'text' fallback
+            is applied.
+
+    Returns:
+        Preprocessed lines, or source lines if a limit was exceeded
+        and 'text' fallback is configured for it."""
+
+    try:
+        return process_markers(lines[:], conf)
+    except GridLimitError as e:
+        if get_limit_action(conf, e.limit) == LIMIT_RAISE:
+            raise
+        return escape_markers(lines) if escape else lines
+
+
+def expand_cmd(command, conf):
+    """Expands a single grid command like 'row' or 'col(span4)' to HTML."""
+    cmd_name, _, params = command.strip().partition('(')
+    if not cmd_name:
+        return ''
+
+    handlers = conf.get('handlers')
+    if handlers is None:
+        message = "Configuration is not processed, see process_configuration()"
+        raise Exception(message)
+
+    handler = handlers.get(cmd_name)
+    if handler is None:
+        raise Exception("Unknown command: '%s'" % str(cmd_name))
+    return handler(params[:-1] if params.endswith(')') else params)
+
+
+def expand_tag(commands, conf):
+    """Expands grid tag content (a list of grid commands separated by
+    semicolon) to HTML. Results are memoized for each distinct tag
+    shorter than TAG_CACHE_KEY_LENGTH."""
+    cache = conf.get('tag_cache')
+    html = cache.get(commands) if cache is not None else None
+    if html is None:
+        html = ''.join([expand_cmd(cmd, conf) for cmd in commands.split(';')])
+        if cache is not None and len(commands) < TAG_CACHE_KEY_LENGTH:
+            if len(cache) >= TAG_CACHE_SIZE:
+                cache.clear()
+            cache[commands] = html
+    return html
+
+
+def expand_tags(text, conf):
+    """Replaces grid tags in the text with HTML."""
+    return TAG.sub(lambda m: expand_tag(m.group(1), conf), text)
+
+
+def render_grid(columns_spec, fragments, profile=DEFAULT_PROFILE):
+    """Wraps pre-rendered HTML fragments into a grid row without running
+    markdown processing.
+
+    Arguments:
+        columns_spec -- --row-- marker arguments string (e.g. '5, 2, 5')
+            or a list of already expanded column styles.
+        fragments -- a list of HTML fragments, one per column.
+        profile -- configuration profile name or a configuration
+            returned by process_configuration().
+
+    Returns:
+        HTML for a single grid row or empty string if there are
+        no fragments. Resource limits are applied the same way as for
+        grid markers: with 'text' fallback the fragments are joined
+        without the grid markup."""
+
+    if not fragments:
+        return ''
+
+    conf = get_profile(profile)
+    try:
+        if isinstance(columns_spec, (list, tuple)):
+            styles = list(columns_spec)
+        else:
+            args = str(columns_spec or '')
+            check_limit(conf, 'max_arg_length', len(args.strip()))
+            styles = parse_row_args(args, conf['aliases'])
+        check_limit(conf, 'max_cols', max(len(styles), len(fragments)))
+        for style in styles:
+            check_limit(conf, 'max_class_length', len(style))
+    except GridLimitError as e:
+        if get_limit_action(conf, e.limit) == LIMIT_RAISE:
+            raise
+        return ''.join(fragments)
+
+    classes = get_col_classes(styles, len(fragments), conf)
+    col_open = conf['handlers'][COL_OPEN_CMD]
+    col_close = conf['col_close']
+    html = [conf['row_open']]
+    for style, fragment in zip(classes, fragments):
+        html += [col_open(style), fragment, col_close]
+    html.append(conf['row_close'])
+    return ''.join(html)
+
+
+def render_grid_text(text, profile=DEFAULT_PROFILE):
+    """Replaces grid markers in the text with HTML without running
+    markdown processing. The text between markers is kept as is, so it is
+    expected to be HTML already.
+
+    Arguments:
+        text -- source text containing grid markers.
+        profile -- configuration profile name or a configuration
+            returned by process_configuration()."""
+
+    conf = get_profile(profile)
+    lines = preprocess(text.split('\n'), conf)
+    return expand_tags('\n'.join(lines), conf)
+
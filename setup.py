@@ -13,7 +13,7 @@ setup(
     url='http://github.com/dreikanter/markdown-grid',
     long_description=open('README.md').read(),
     package_dir={'mdx_grid': '.'},
-    py_modules=['mdx_grid'],
+    py_modules=['mdx_grid', 'mdx_grid_core'],
     platforms=['any'],
     install_requires=['markdown'],
     zip_safe=False,
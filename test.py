@@ -1,5 +1,11 @@
+import os
+import sys
 import unittest
+import timeit
+import subprocess
 import mdx_grid
+import mdx_grid_core
+import loadtest
 import random
 import markdown
 from pprint import pprint
@@ -134,6 +140,282 @@ class AliasProcessingTest(unittest.TestCase):
             self.assertListEqual(result, actual_result)
 
 
+class LimitsTest(unittest.TestCase):
+    source = [
+        '-- row 1, 2 --',
+        'First column',
+        '--',
+        'Second column',
+        '-- end --',
+        '-- row --',
+        'Single column',
+        '-- end --',
+    ]
+
+    def get_preprocessor(self, **limits):
+        conf = dict(mdx_grid.get_conf(mdx_grid.DEFAULT_PROFILE))
+        conf.update(limits)
+        pp = mdx_grid.GridPreprocessor(markdown.Markdown())
+        pp.conf = mdx_grid.process_configuration(conf)
+        return pp
+
+    def test_no_limits(self):
+        pp = self.get_preprocessor()
+        result = pp.run(self.source[:])
+        self.assertNotEqual(self.source, result)
+
+    def test_limits_raise(self):
+        test_values = [
+            ('max_markers', 2),
+            ('max_rows', 1),
+            ('max_cols', 1),
+            ('max_arg_length', 3),
+            ('max_class_length', 4),
+        ]
+
+        for limit, value in test_values:
+            pp = self.get_preprocessor(**{limit: value})
+            with self.assertRaises(mdx_grid.GridLimitError) as cm:
+                pp.run(self.source[:])
+            self.assertEqual(limit, cm.exception.limit)
+
+    def test_limits_text(self):
+        # Markdown preprocessor escapes the markers on 'text' fallback
+        escaped = mdx_grid.escape_markers(self.source)
+        self.assertEqual('\\-- row 1, 2 --', escaped[0])
+
+        pp = self.get_preprocessor(max_markers=2, on_limit='text')
+        self.assertListEqual(escaped, pp.run(self.source[:]))
+
+        on_limit = {'max_cols': mdx_grid.LIMIT_TEXT}
+        pp = self.get_preprocessor(max_cols=1, on_limit=on_limit)
+        self.assertListEqual(escaped, pp.run(self.source[:]))
+
+        conf = mdx_grid.process_configuration({'max_cols': 1,
+                                               'on_limit': 'text'})
+        self.assertListEqual(self.source,
+                             mdx_grid.preprocess(self.source, conf))
+
+        pp = self.get_preprocessor(max_rows=1, on_limit=on_limit)
+        self.assertRaises(mdx_grid.GridLimitError, pp.run, self.source[:])
+
+    def test_time_budget(self):
+        # Fake clock moving one second forward on each reading
+        clock = iter(range(1000))
+        timer = mdx_grid_core.timer
+        mdx_grid_core.timer = lambda: next(clock)
+        try:
+            pp = self.get_preprocessor(time_budget=2, on_limit='text')
+            self.assertListEqual(mdx_grid.escape_markers(self.source),
+                                 pp.run(self.source[:]))
+        finally:
+            mdx_grid_core.timer = timer
+
+    def test_time_budget_value(self):
+        clock = iter(range(1000))
+        timer = mdx_grid_core.timer
+        mdx_grid_core.timer = lambda: next(clock)
+        try:
+            pp = self.get_preprocessor(time_budget=2)
+            with self.assertRaises(mdx_grid.GridLimitError) as cm:
+                pp.run(self.source[:])
+        finally:
+            mdx_grid_core.timer = timer
+        self.assertEqual(4, cm.exception.value)
+
+    def test_text_fallback_markdown(self):
+        source = '-- row 5, 7 --\nhello\n\npara\n--\nworld\n-- end --'
+        conf = {'max_markers': 2, 'on_limit': 'text'}
+        md = markdown.Markdown(extensions=[mdx_grid.GridExtension(conf)])
+        self.assertEqual('<p>-- row 5, 7 --\nhello</p>\n'
+                         '<p>para\n--\nworld\n-- end --</p>',
+                         md.convert(source))
+
+    def test_arg_length_padding(self):
+        pp = self.get_preprocessor(max_arg_length=3)
+        result = pp.run(['-- row      5 --', 'a', '-- end --'])
+        self.assertNotEqual('-- row      5 --', result[0])
+
+    def test_row_marker_backtracking(self):
+        # Row marker lookalikes should be rejected in linear time
+        source = ['-- row ' + ' ' * 2000 + 'x']
+        pp = self.get_preprocessor(max_arg_length=100, on_limit='text')
+        started = timeit.default_timer()
+        self.assertListEqual(source, pp.run(source[:]))
+        self.assertLess(timeit.default_timer() - started, 1)
+
+    def test_limit_values(self):
+        pp = self.get_preprocessor(max_markers='2', time_budget='0.5')
+        self.assertEqual(2, pp.conf['max_markers'])
+        self.assertEqual(0.5, pp.conf['time_budget'])
+        pp = self.get_preprocessor(max_rows=None)
+        self.assertEqual(0, pp.conf['max_rows'])
+
+        for value in (-1, 'potatoes', '1.5', 1.9, True, float('nan')):
+            self.assertRaises(Exception, self.get_preprocessor,
+                              max_markers=value)
+
+    def test_invalid_action(self):
+        self.assertRaises(Exception, self.get_preprocessor, on_limit='skip')
+        self.assertRaises(Exception, self.get_preprocessor,
+                          on_limit={'max_potatoes': 'text'})
+
+
+class RenderTest(unittest.TestCase):
+    def test_render_grid(self):
+        test_values = [
+            ('5, 2', ['a', 'b'], mdx_grid.DEFAULT_PROFILE,
+             '<div class="row"><div class="span5 first">a</div>'
+             '<div class="span2 last">b</div></div>'),
+            ('5', ['a', 'b', 'c'], mdx_grid.DEFAULT_PROFILE,
+             '<div class="row"><div class="span5 first">a</div>'
+             '<div class="span1">b</div><div class="span1 last">c</div></div>'),
+            (['one'], ['a'], mdx_grid.SKELETON_PROFILE,
+             '<div class="row"><div class="one omega columns">a</div></div>'),
+            ('1', [], mdx_grid.DEFAULT_PROFILE, ''),
+        ]
+
+        for spec, fragments, profile, result in test_values:
+            actual_result = mdx_grid.render_grid(spec, fragments, profile)
+            self.assertEqual(result, actual_result)
+
+    def test_render_grid_text(self):
+        source = '-- row 5, 7 --\n<p>a</p>\n--\n<p>b</p>\n-- end --'
+        result = mdx_grid.render_grid(
+            '5, 7', ['<p>a</p>', '<p>b</p>'], mdx_grid.BOOTSTRAP3_PROFILE)
+        actual_result = mdx_grid.render_grid_text(
+            source, mdx_grid.BOOTSTRAP3_PROFILE)
+        self.assertEqual(result, actual_result)
+
+    def test_compile_template(self):
+        test_values = [
+            ('<div class="{value}">', '<div class="span1">'),
+            ('<div class="{value} columns">', '<div class="span1 columns">'),
+            ('{value}', 'span1'),
+            ('<div>', '<div>'),
+            ('<div class="{value}" data-x="{{}}">',
+             '<div class="span1" data-x="{}">'),
+        ]
+
+        for template, result in test_values:
+            render = mdx_grid.compile_template(template)
+            self.assertEqual(result, render('span1'))
+
+    def test_expand_cmd(self):
+        conf = mdx_grid.process_configuration(None)
+        test_values = [
+            ('row', '<div class="row">'),
+            ('col(span4 first)', '<div class="span4 first">'),
+            ('col()', '<div class="">'),
+            ('col', '<div class="">'),
+            ('endcol', '</div>'),
+            ('endrow', '</div>'),
+            ('', ''),
+        ]
+
+        for value, result in test_values:
+            self.assertEqual(result, mdx_grid.expand_cmd(value, conf))
+
+        self.assertRaises(Exception, mdx_grid.expand_cmd, 'potatoes', conf)
+        # Unprocessed configuration is not reported as an unknown command
+        with self.assertRaises(Exception) as cm:
+            mdx_grid.expand_cmd('row', mdx_grid.get_conf())
+        self.assertIn('not processed', str(cm.exception))
+
+    def test_tag_cache(self):
+        conf = mdx_grid.process_configuration(None)
+        cache_size = mdx_grid_core.TAG_CACHE_SIZE
+        mdx_grid_core.TAG_CACHE_SIZE = 2
+        try:
+            for tag in ('row', 'row', 'endcol;endrow', 'endcol'):
+                text = '<!--grid:%s-->' % tag
+                self.assertEqual(mdx_grid.expand_tags(text, conf),
+                                 mdx_grid.expand_tag(tag, conf))
+        finally:
+            mdx_grid_core.TAG_CACHE_SIZE = cache_size
+
+        self.assertListEqual(['endcol'], list(conf['tag_cache']))
+
+        # Long tags could be injected by the document, they are not cached
+        tag = 'col(%s)' % ('x' * mdx_grid_core.TAG_CACHE_KEY_LENGTH)
+        html = mdx_grid.expand_tags('<!--grid:%s-->' % tag, conf)
+        self.assertEqual('<div class="%s">' % tag[4:-1], html)
+        self.assertListEqual(['endcol'], list(conf['tag_cache']))
+
+    def test_raw_profile(self):
+        result = '<div class="row"><div class="span5 last">a</div></div>'
+        for profile in (mdx_grid.get_conf(mdx_grid.DEFAULT_PROFILE),
+                        mdx_grid.process_configuration(None)):
+            actual_result = mdx_grid.render_grid('5', ['a'], profile)
+            self.assertEqual(result, actual_result)
+
+    def test_render_grid_limits(self):
+        conf = dict(mdx_grid.get_conf(mdx_grid.DEFAULT_PROFILE), max_cols=2)
+        self.assertRaises(mdx_grid.GridLimitError, mdx_grid.render_grid,
+                          '1', ['a', 'b', 'c'], conf)
+        self.assertRaises(mdx_grid.GridLimitError, mdx_grid.render_grid,
+                          '1, 2, 3', ['a'], conf)
+
+        conf.update(max_class_length=5, on_limit='text')
+        actual_result = mdx_grid.render_grid('12', ['a', 'b'], conf)
+        self.assertEqual('ab', actual_result)
+
+    def test_no_markdown_import(self):
+        code = ("import sys, mdx_grid_core; "
+                "mdx_grid_core.render_grid_text('-- row --'); "
+                "sys.exit('markdown' in sys.modules)")
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        self.assertEqual(0, subprocess.call([sys.executable, '-c', code],
+                                            cwd=cwd))
+
+    def test_unclosed_row(self):
+        actual_result = mdx_grid.render_grid_text('-- row 5 --\na')
+        self.assertEqual('<div class="row"><div class="span5 first">a'
+                         '</div></div>', actual_result)
+
+
+class LoadTestTest(unittest.TestCase):
+    def test_parse_mix(self):
+        test_values = [
+            ('plain=4,grid=4', {'plain': 4.0, 'grid': 4.0}),
+            ('plain=1.5, malformed=2', {'plain': 1.5, 'malformed': 2.0}),
+            ('grid', {'grid': 1.0}),
+        ]
+
+        for value, result in test_values:
+            self.assertEqual(result, loadtest.parse_mix(value))
+
+        self.assertRaises(Exception, loadtest.parse_mix, 'potatoes=1')
+
+    def test_parse_config_value(self):
+        test_values = [
+            ('200', 200),
+            ('0.5', 0.5),
+            ('text', 'text'),
+            ('', ''),
+        ]
+
+        for value, result in test_values:
+            actual_result = loadtest.parse_config_value(value)
+            self.assertEqual(result, actual_result)
+            self.assertEqual(type(result), type(actual_result))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        test_values = [
+            (values, 50, 50),
+            (values, 95, 95),
+            (values, 99, 99),
+            (values, 100, 100),
+            (values, 0, 1),
+            ([7], 99, 7),
+            ([], 50, 0.0),
+        ]
+
+        for values, pct, result in test_values:
+            self.assertEqual(result, loadtest.percentile(values, pct))
+
+
 # class PostprocessorTest(unittest.TestCase):
 #     def setUp(self):
 #         return